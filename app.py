@@ -1,234 +1,474 @@
-import json
-import base64
-import requests
+import os
+import asyncio
+import functools
 import hmac
 import hashlib
+import logging
+import logging.handlers
+import queue
 import time
-from flask import Flask, request, make_response, redirect, abort
-from upstash_redis import Redis
+from contextlib import asynccontextmanager
 
-app = Flask(__name__)
+import aiohttp
+import orjson
+import pybase64
+import uvicorn
+from cachetools import TTLCache
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from upstash_redis.asyncio import Redis
 
 # === CONFIGURATION ===
 SLACK_TOKEN = os.environ.get("SLACK_TOKEN")
 SLACK_CLIENT_ID = os.environ.get("SLACK_CLIENT_ID")
 SLACK_CLIENT_SECRET = os.environ.get("SLACK_CLIENT_SECRET")
 SLACK_SIGNING_SECRET = os.environ.get("SLACK_SIGNING_SECRET")
+SLACK_SIGNING_SECRET_BYTES = (SLACK_SIGNING_SECRET or "").encode()
 REDIS_URL = os.environ.get("UPSTASH_REDIS_REST_URL")
 REDIS_TOKEN = os.environ.get("UPSTASH_REDIS_REST_TOKEN")
-TILITER_URL = "https://api.ai.vision.tiliter.com/api/v1/inference/receipt-processor"
+TILITER_API_BASE = "https://api.ai.vision.tiliter.com/api/v1/inference"
+AGENT_URLS = {
+    agent: f"{TILITER_API_BASE}/{agent}"
+    for agent in (
+        "object-counter", "object-validator", "label-validator",
+        "damage-detector", "cleanliness-score", "text-extractor",
+        "receipt-processor",
+    )
+}
+
+# Slack reports attachment sizes up-front; anything bigger is rejected
+# before we spend a download + inference on it.
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Bounded waits so one slow peer can't pin a request indefinitely; the
+# inference call gets a longer ceiling than the Slack API hops.
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(connect=3.05, total=30)
+TILITER_TIMEOUT = aiohttp.ClientTimeout(connect=3.05, total=60)
+
+logger = logging.getLogger(__name__)
+
+def _configure_logging():
+    """Route records through a queue so handler I/O (a blocking stdout
+    write) runs on the listener thread, never on the event loop."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+    return listener
 
 redis = Redis(url=REDIS_URL, token=REDIS_TOKEN)
-processed_event_ids = set()
+
+# In-process caches in front of Upstash. Bot tokens essentially never
+# change; user API keys get a short TTL since keys can be rotated from
+# another worker, and writes on this worker update the cache directly.
+_token_cache = TTLCache(maxsize=10_000, ttl=600)
+_key_cache = TTLCache(maxsize=10_000, ttl=60)
+
+session: aiohttp.ClientSession = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global session
+    log_listener = _configure_logging()
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, limit_per_host=30, keepalive_timeout=75),
+        timeout=DEFAULT_TIMEOUT
+    )
+    yield
+    await session.close()
+    log_listener.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# Transient failures worth retrying, matching urllib3's Retry defaults
+# for idempotent-ish API calls.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.2
+
+async def retrying_request(method, url, **kwargs):
+    """Issue a request on the shared session, retrying transient
+    connection errors and 429/5xx responses with exponential backoff."""
+    for attempt in range(RETRY_TOTAL):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+        try:
+            response = await session.request(method, url, **kwargs)
+        except aiohttp.ClientConnectionError:
+            if attempt == RETRY_TOTAL - 1:
+                raise
+            continue
+        if response.status in RETRY_STATUSES and attempt < RETRY_TOTAL - 1:
+            response.release()
+            continue
+        return response
+
+# Tokens are per-workspace, so the same few header dicts get rebuilt on
+# every outbound call — memoize them per token instead.
+@functools.lru_cache(maxsize=1024)
+def _slack_auth_headers(bot_token):
+    return {'Authorization': f'Bearer {bot_token}'}
+
+@functools.lru_cache(maxsize=1024)
+def _slack_post_headers(bot_token):
+    return {'Authorization': f'Bearer {bot_token}', 'Content-Type': 'application/json'}
+
+# Strong references so in-flight background tasks aren't garbage-collected.
+_background_tasks = set()
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
 
 # === Slack request verification ===
-def verify_slack_request(req):
-    timestamp = req.headers.get('X-Slack-Request-Timestamp')
-    if abs(time.time() - int(timestamp)) > 60 * 5:
-        abort(400, "Invalid request timestamp.")
+async def verify_slack_request(req: Request) -> bytes:
+    body = await req.body()
 
-    sig_basestring = f"v0:{timestamp}:{req.get_data(as_text=True)}"
+    timestamp = req.headers.get('X-Slack-Request-Timestamp')
+    slack_signature = req.headers.get('X-Slack-Signature')
+    if not timestamp or not slack_signature:
+        raise HTTPException(400, "Missing Slack signature headers.")
+    try:
+        ts = int(timestamp)
+    except ValueError:
+        raise HTTPException(400, "Invalid request timestamp.")
+    if abs(time.time() - ts) > 60 * 5:
+        raise HTTPException(400, "Invalid request timestamp.")
+
+    # Build the basestring in bytes so the (possibly MB-sized) body is
+    # never decoded and re-encoded just to be hashed.
+    sig_basestring = b"v0:" + timestamp.encode() + b":" + body
     my_signature = 'v0=' + hmac.new(
-        SLACK_SIGNING_SECRET.encode(),
-        sig_basestring.encode(),
+        SLACK_SIGNING_SECRET_BYTES,
+        sig_basestring,
         hashlib.sha256
     ).hexdigest()
 
-    slack_signature = req.headers.get('X-Slack-Signature')
     if not hmac.compare_digest(my_signature, slack_signature):
-        abort(400, "Invalid Slack signature.")
+        raise HTTPException(400, "Invalid Slack signature.")
 
-@app.route("/")
-def health():
-    return "Slack bot is running.", 200
+    return body
 
-@app.route("/install")
-def install():
+@app.get("/")
+async def health():
+    return PlainTextResponse("Slack bot is running.")
+
+@app.get("/install")
+async def install():
     slack_url = (
         "https://slack.com/oauth/v2/authorize"
         f"?client_id={SLACK_CLIENT_ID}"
         "&scope=commands,files:read,chat:write"
         "&user_scope="
     )
-    return redirect(slack_url)
+    return RedirectResponse(slack_url)
 
-@app.route("/oauth/callback")
-def oauth_callback():
-    code = request.args.get("code")
+@app.get("/oauth/callback")
+async def oauth_callback(request: Request):
+    code = request.query_params.get("code")
     if not code:
-        return "Missing code", 400
+        return PlainTextResponse("Missing code", status_code=400)
 
-    response = requests.post("https://slack.com/api/oauth.v2.access", data={
+    async with await retrying_request("POST", "https://slack.com/api/oauth.v2.access", data={
         "client_id": SLACK_CLIENT_ID,
         "client_secret": SLACK_CLIENT_SECRET,
         "code": code
+    }) as response:
+        raw = await response.read()
+        body = orjson.loads(raw) if response.status == 200 else None
+        if body is None or not body.get("ok"):
+            logger.error("OAuth error: %s", raw.decode(errors="replace"))
+            return PlainTextResponse("OAuth failed", status_code=400)
+
+    team_id = body["team"]["id"]
+    access_token = body["access_token"]
+
+    # One hash per team keeps install metadata together and lets future
+    # per-team fields ride the same key instead of multiplying round-trips.
+    await redis.hset(f"team:{team_id}", values={
+        "token": access_token,
+        "installed_at": int(time.time()),
     })
+    _token_cache[team_id] = access_token
 
-    if response.status_code != 200 or not response.json().get("ok"):
-        print("❌ OAuth error:", response.text)
-        return "OAuth failed", 400
-
-    json_resp = response.json()
-    team_id = json_resp["team"]["id"]
-    access_token = json_resp["access_token"]
+    logger.info("[METRIC] New app install: team_id=%s", team_id)
+    return PlainTextResponse("App installed successfully! You can now use the Tiliter bot in your Slack workspace.")
 
-    redis.set(f"token:{team_id}", access_token)
-
-    print(f"[METRIC] New app install: team_id={team_id}")
-    return "App installed successfully! You can now use the Tiliter bot in your Slack workspace."
-
-@app.route("/events", methods=["POST"])
-def slack_events():
-    verify_slack_request(request)
-    data = request.json
+@app.post("/events")
+async def slack_events(request: Request):
+    body = await verify_slack_request(request)
+    data = orjson.loads(body)
 
     if data.get("type") == "url_verification":
-        return make_response(data["challenge"], 200, {"Content-Type": "text/plain"})
+        return PlainTextResponse(data["challenge"])
 
     team_id = data.get("team_id")
-    bot_token = redis.get(f"token:{team_id}")
-    if not bot_token:
-        bot_token = SLACK_TOKEN  # fallback to static token
-        print(f"[WARN] No stored bot token for team_id={team_id}. Using fallback SLACK_TOKEN.")
-    if isinstance(bot_token, bytes):
-        bot_token = bot_token.decode()
-
     event = data.get("event", {})
     event_id = data.get("event_id")
     user_id = event.get("user")
     event_type = event.get("type")
     subtype = event.get("subtype")
+    # Only consulted on an API-key miss, but the extra GET rides along
+    # free in the pipeline below.
+    warn_key = f"warned:{user_id}:{event.get('ts')}"
+
+    # SETNX with a TTL dedupes Slack retries across workers and replicas,
+    # unlike the old per-process set (which also grew without bound).
+    if not await redis.set(f"evt:{event_id}", "1", nx=True, ex=600):
+        return PlainTextResponse("Duplicate")
+
+    bot_token = _token_cache.get(team_id)
+    api_key = _key_cache.get(user_id)
+    warned = None
+
+    if bot_token is None or api_key is None:
+        # One round-trip to Upstash instead of sequential GETs. The legacy
+        # token:{team_id} key rides along for installs that predate the
+        # team:{team_id} hash.
+        p = redis.pipeline()
+        p.hget(f"team:{team_id}", "token")
+        p.get(f"token:{team_id}")
+        p.get(f"key:{user_id}")
+        p.get(warn_key)
+        fetched_token, legacy_token, fetched_key, warned = await p.exec()
+        fetched_token = fetched_token or legacy_token
+        if bot_token is None and fetched_token:
+            bot_token = _token_cache[team_id] = fetched_token
+        if api_key is None and fetched_key:
+            api_key = _key_cache[user_id] = fetched_key
 
-    if event_id in processed_event_ids:
-        return make_response("Duplicate", 200)
-    processed_event_ids.add(event_id)
+    if not bot_token:
+        bot_token = SLACK_TOKEN  # fallback to static token
+        logger.warning("No stored bot token for team_id=%s. Using fallback SLACK_TOKEN.", team_id)
+    if isinstance(bot_token, bytes):
+        bot_token = bot_token.decode()
 
     if event_type == "message" and subtype == "file_share":
         if "bot_id" in event:
-            return make_response("Ignore bot", 200)
+            return PlainTextResponse("Ignore bot")
 
-        api_key = redis.get(f"key:{user_id}")
         if api_key is None:
-            warn_key = f"warned:{user_id}:{event.get('ts')}"
-            if not redis.get(warn_key):
-                redis.set(warn_key, "1", ex=3600)
-                print(f"[WARN] No API key for user: {user_id}")
-                post_to_slack(event.get("channel"), event.get("ts"),
+            if not warned:
+                await redis.set(warn_key, "1", ex=3600)
+                logger.warning("No API key for user: %s", user_id)
+                await post_to_slack(event.get("channel"), event.get("ts"),
                     ":warning: You haven’t set your Tiliter API key yet.\n\nVisit https://ai.vision.tiliter.com to purchase credits, then use `/set-apikey YOUR_KEY` to activate.",
                     bot_token
                 )
-            return make_response("No API key", 200)
+            return PlainTextResponse("No API key")
 
         if isinstance(api_key, bytes):
             api_key = api_key.decode()
 
-        for file in event.get("files", []):
-            if file.get("mimetype", "").startswith("image/"):
-                print(f"[EVENT] Image upload received by user {user_id} in channel {event.get('channel')}")
-                image_url = file["url_private"]
-                result = handle_image(image_url, api_key, bot_token)
-                post_to_slack(event["channel"], event["ts"], result, bot_token)
-
-    return make_response("OK", 200)
-
-@app.route("/set-apikey", methods=["POST"])
-def set_api_key():
-    verify_slack_request(request)
-    payload = request.form
+        # Slack expects a 200 within 3 seconds; the download + inference can
+        # take far longer, so ack now and finish in the background. The
+        # Redis dedupe above keeps retried deliveries from enqueueing twice.
+        spawn(process_upload(event, api_key, bot_token))
+
+    return PlainTextResponse("OK")
+
+async def process_upload(event, api_key, bot_token):
+    # Fan out so a message with N images takes ~one download+inference
+    # round-trip instead of N sequential ones.
+    await asyncio.gather(*(
+        process_file(file, event, api_key, bot_token)
+        for file in event.get("files", [])
+    ))
+
+async def process_file(file, event, api_key, bot_token):
+    if not file.get("mimetype", "").startswith("image/"):
+        return
+    # This runs in a fire-and-forget task after the event was acked, and
+    # the Redis dedupe means Slack's retry won't re-deliver it — so any
+    # failure here must be reported to the thread, not left to die as an
+    # unretrieved task exception.
+    try:
+        if file.get("size", 0) > MAX_IMAGE_BYTES:
+            logger.warning("Skipping oversized file (%s bytes) from user %s", file.get("size"), event.get("user"))
+            await post_to_slack(event["channel"], event["ts"],
+                f":x: File too large to process (limit {MAX_IMAGE_BYTES // (1024 * 1024)} MB).",
+                bot_token
+            )
+            return
+        logger.info("[EVENT] Image upload received by user %s in channel %s", event.get("user"), event.get("channel"))
+        result = await handle_image(file["url_private"], api_key, bot_token)
+        await post_to_slack(event["channel"], event["ts"], result, bot_token)
+    except Exception as e:
+        logger.exception("Failed to process upload from user %s in channel %s", event.get("user"), event.get("channel"))
+        try:
+            await post_to_slack(event["channel"], event["ts"],
+                f":x: Failed to process image: {str(e) or type(e).__name__}. Please try again.",
+                bot_token
+            )
+        except Exception:
+            logger.exception("Failed to post error reply to channel %s", event.get("channel"))
+
+@app.post("/set-apikey")
+async def set_api_key(request: Request):
+    await verify_slack_request(request)
+    payload = await request.form()
     user_id = payload.get("user_id")
-    text = payload.get("text", "").strip()
+    text = (payload.get("text") or "").strip()
 
     if not text:
-        return make_response("Usage: /set-apikey YOUR_KEY", 200)
-
-    redis.set(f"key:{user_id}", text)
-    print(f"[METRIC] API key SET for user: {user_id}")
-    return make_response("✅ Tiliter API key saved successfully.", 200)
-
-@app.route("/get-apikey", methods=["POST"])
-def get_api_key():
-    verify_slack_request(request)
-    user_id = request.form.get("user_id")
-    print(f"[METRIC] API key GET for user: {user_id}")
-    api_key = redis.get(f"key:{user_id}")
+        return PlainTextResponse("Usage: /set-apikey YOUR_KEY")
+
+    await redis.set(f"key:{user_id}", text)
+    _key_cache[user_id] = text
+    logger.info("[METRIC] API key SET for user: %s", user_id)
+    return PlainTextResponse("✅ Tiliter API key saved successfully.")
+
+@app.post("/get-apikey")
+async def get_api_key(request: Request):
+    await verify_slack_request(request)
+    payload = await request.form()
+    user_id = payload.get("user_id")
+    logger.info("[METRIC] API key GET for user: %s", user_id)
+    api_key = await redis.get(f"key:{user_id}")
     if api_key:
         if isinstance(api_key, bytes):
             api_key = api_key.decode()
-        return make_response(f"🔐 Your current API key is:\n```{api_key}```", 200)
-    return make_response("❌ No API key set.", 200)
-
-@app.route("/delete-apikey", methods=["POST"])
-def delete_api_key():
-    verify_slack_request(request)
-    user_id = request.form.get("user_id")
-    redis.delete(f"key:{user_id}")
-    print(f"[METRIC] API key DELETE for user: {user_id}")
-    return make_response("🗑️ Tiliter API key removed.", 200)
-
-def handle_image(image_url, api_key, bot_token):
-    print("⬇️ Downloading image from Slack...")
-    image_response = requests.get(image_url, headers={'Authorization': f'Bearer {bot_token}'})
-    if image_response.status_code != 200:
-        print(f"[ERROR] Failed to download image from Slack. Status: {image_response.status_code}")
-        return f":x: Failed to download image. Status: {image_response.status_code}"
-
-    image_b64 = base64.b64encode(image_response.content).decode('utf-8')
-    payload = { "image_data": f"data:image/jpeg;base64,{image_b64}" }
-
-    print("📤 Sending to Tiliter API...")
-    response = requests.post(
-        TILITER_URL,
-        headers={'X-API-Key': api_key, 'Content-Type': 'application/json'},
-        json=payload
-    )
+        return PlainTextResponse(f"🔐 Your current API key is:\n```{api_key}```")
+    return PlainTextResponse("❌ No API key set.")
 
-    if response.status_code != 200:
-        print(f"[ERROR] Tiliter API error {response.status_code}: {response.text}")
-        return f":x: Tiliter API error {response.status_code}: {response.text}"
+@app.post("/delete-apikey")
+async def delete_api_key(request: Request):
+    await verify_slack_request(request)
+    payload = await request.form()
+    user_id = payload.get("user_id")
+    await redis.delete(f"key:{user_id}")
+    _key_cache.pop(user_id, None)
+    logger.info("[METRIC] API key DELETE for user: %s", user_id)
+    return PlainTextResponse("🗑️ Tiliter API key removed.")
+
+async def handle_image(image_url, api_key, bot_token, agent_type="receipt-processor"):
+    tiliter_url = AGENT_URLS.get(agent_type)
+    if tiliter_url is None:
+        logger.error("Unknown Tiliter agent: %s", agent_type)
+        return f":x: Unknown Tiliter agent: {agent_type}"
+
+    logger.debug("Downloading image from Slack...")
+    async with await retrying_request("GET", image_url, headers=_slack_auth_headers(bot_token)) as image_response:
+        if image_response.status != 200:
+            logger.error("Failed to download image from Slack. Status: %s", image_response.status)
+            return f":x: Failed to download image. Status: {image_response.status}"
+        # Stream the download straight into the JSON body. Base64 (and the
+        # data: URI prefix) never needs JSON escaping, so the wrapper can be
+        # written as raw bytes instead of holding image + b64 str + JSON
+        # copies in memory at once. Chunks are re-aligned to a multiple of 3
+        # so no padding appears mid-stream.
+        payload = bytearray(b'{"image_data":"data:image/jpeg;base64,')
+        pending = b""
+        async for chunk in image_response.content.iter_chunked(57 * 1024):
+            pending += chunk
+            usable = len(pending) - len(pending) % 3
+            payload += pybase64.b64encode(pending[:usable])
+            pending = pending[usable:]
+        payload += pybase64.b64encode(pending)
+        payload += b'"}'
+
+    logger.debug("Sending to Tiliter API...")
+    async with await retrying_request(
+        "POST",
+        tiliter_url,
+        headers={'X-API-Key': api_key, 'Content-Type': 'application/json'},
+        data=bytes(payload),
+        timeout=TILITER_TIMEOUT
+    ) as response:
+        if response.status != 200:
+            text = await response.text()
+            logger.error("Tiliter API error %s: %s", response.status, text)
+            return f":x: Tiliter API error {response.status}: {text}"
+
+        try:
+            result = (await response.json()).get("result", {})
+        except Exception as e:
+            logger.error("Exception in parsing Tiliter response: %s", e)
+            return f":x: Could not parse Tiliter response:\n{str(e)}"
 
     try:
-        result = response.json().get("result", {})
-        print("✅ Tiliter API response:")
-        print(json.dumps(result, indent=2))
-
-        merchant = result.get("merchant", "Unknown")
-        total = result.get("total", "N/A")
-        date = result.get("date", "N/A")
-        address = result.get("address", "")
-        currency = result.get("currency", "")
-
-        items = result.get("items", [])
-        if not items:
-            item_lines = "_No items detected._"
-        else:
-            item_lines = "\n".join([f"• {item.get('name', 'Unnamed')} — {item.get('price', 'N/A')}{currency}" for item in items])
-
-        return (
-            f":receipt: *Receipt Details:*\n"
-            f"- Merchant: *{merchant}*\n"
-            f"- Date: *{date}*\n"
-            f"- Total: *{total}{currency}*\n"
-            f"- Address: {address}\n\n"
-            f":shopping_trolley: *Items:*\n{item_lines}"
-        )
+        # %s keeps the stringify lazy: it only runs when DEBUG is enabled.
+        logger.debug("Tiliter API response: %s", result)
+        return format_receipt(result)
     except Exception as e:
-        print(f"[ERROR] Exception in parsing Tiliter response: {str(e)}")
+        logger.error("Exception in parsing Tiliter response: %s", e)
         return f":x: Could not parse Tiliter response:\n{str(e)}"
 
-def post_to_slack(channel, thread_ts, message, bot_token):
-    res = requests.post(
+_RECEIPT_TEMPLATE = (
+    ":receipt: *Receipt Details:*\n"
+    "- Merchant: *{merchant}*\n"
+    "- Date: *{date}*\n"
+    "- Total: *{total}{currency}*\n"
+    "- Address: {address}\n\n"
+    ":shopping_trolley: *Items:*\n{item_lines}"
+)
+
+def format_receipt(result):
+    currency = result.get("currency", "")
+    items = result.get("items", [])
+    if not items:
+        item_lines = "_No items detected._"
+    else:
+        item_lines = "\n".join(
+            f"• {item.get('name', 'Unnamed')} — {item.get('price', 'N/A')}{currency}"
+            for item in items
+        )
+    return _RECEIPT_TEMPLATE.format_map({
+        "merchant": result.get("merchant", "Unknown"),
+        "date": result.get("date", "N/A"),
+        "total": result.get("total", "N/A"),
+        "currency": currency,
+        "address": result.get("address", ""),
+        "item_lines": item_lines,
+    })
+
+# Coalesce replies to the same thread so burst uploads don't trip Slack's
+# ~1 msg/s chat.postMessage tier limit: messages queue per
+# (channel, thread_ts) and flush as one post after FLUSH_INTERVAL or once
+# FLUSH_MAX_MESSAGES pile up.
+FLUSH_MAX_MESSAGES = 50
+FLUSH_INTERVAL = 0.5
+
+_outbox = {}
+
+async def post_to_slack(channel, thread_ts, message, bot_token):
+    key = (channel, thread_ts, bot_token)
+    pending = _outbox.get(key)
+    if pending is not None:
+        pending.append(message)
+        if len(pending) >= FLUSH_MAX_MESSAGES:
+            _outbox.pop(key, None)
+            await _flush_to_slack(channel, thread_ts, pending, bot_token)
+        return
+
+    # First message for this thread in the window: wait for stragglers,
+    # then flush whatever accumulated in one call.
+    _outbox[key] = [message]
+    await asyncio.sleep(FLUSH_INTERVAL)
+    pending = _outbox.pop(key, None)
+    if pending:
+        await _flush_to_slack(channel, thread_ts, pending, bot_token)
+
+async def _flush_to_slack(channel, thread_ts, messages, bot_token):
+    async with await retrying_request(
+        "POST",
         'https://slack.com/api/chat.postMessage',
-        headers={
-            'Authorization': f'Bearer {bot_token}',
-            'Content-Type': 'application/json'
-        },
-        json={
+        headers=_slack_post_headers(bot_token),
+        data=orjson.dumps({
             'channel': channel,
             'thread_ts': thread_ts,
-            'text': message
-        }
-    )
-    print("🔁 Slack API response:", res.status_code, res.text)
+            'text': "\n".join(messages)
+        })
+    ) as res:
+        logger.debug("Slack API response: %s %s", res.status, await res.text())
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+    # Local development only — production runs multi-worker uvicorn via
+    # the startCommand in render.yaml.
+    uvicorn.run("app:app", host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))